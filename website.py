@@ -1,14 +1,16 @@
+import hashlib
 import os
-import json
 import re
+import tempfile
+import threading
 import traceback
 from datetime import datetime
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
-import networkx as nx
-import plotly.graph_objects as go
 import dash
-from dash import html, dcc
+from dash import html, dcc, ctx
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
 
@@ -26,178 +28,407 @@ v2_path = os.path.join(DATA_DIR, "ECA_Campaigns_FY25_ALL_v2.xlsx")
 # Define Stata's epoch
 STATA_EPOCH = pd.Timestamp('1960-01-01')
 
-# ------------------------------
-# Load and process the main data file
-df = pd.read_excel(input_path)
-df.columns = df.columns.str.lower().str.replace(' ', '')
-df['startdate'] = df['startdateandtime'].str.split(',').str[0]
-df['enddate'] = df['enddateandtime'].str.split(',').str[0]
-df['starttime'] = df['startdateandtime'].str.split(',').str[1]
-df['endtime'] = df['enddateandtime'].str.split(',').str[1]
-df.drop(columns=['startdateandtime', 'enddateandtime'], inplace=True)
-df['num_startdate'] = pd.to_datetime(df['startdate'], format='%m/%d/%Y', errors='coerce')
-df['num_startdate'] = (df['num_startdate'] - STATA_EPOCH).dt.days
-df['parents_id'] = df['parentcampaignname'].astype('category').cat.codes
-df.sort_values(by=['parentcampaignname', 'num_startdate'], inplace=True)
-df['num_campaigns'] = df.groupby('parentcampaignname').cumcount() + 1
-df['meeting'] = (df['ecaactivitytype'] == 'Meeting').astype(int)
-df['event'] = (df['ecaactivitytype'] == 'Event').astype(int)
-df['firsttime'] = ((df['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") | 
-                   (df['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")).astype(int)
-df['frst_inquiry'] = (df['interactiontype'] == "1st Time Inquiry – Requested by Org or Group").astype(int)
-df['frst_outreach'] = (df['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff").astype(int)
-df['followup_mtg'] = (df['interactiontype'] == "Follow Up Project Planning or Problem-Solving Meeting").astype(int)
-df['reoccurring'] = (df['interactiontype'] == "Reoccurring activity").astype(int)
-df['repeat'] = (df['interactiontype'] == "Repeat – For Purposes of Ongoing Participation or to Rep ECA").astype(int)
-df['community_mtg'] = (df['interactiontype'] == "Community Meeting").astype(int)
-df['standalone'] = (df['interactiontype'] == "Stand alone activity").astype(int)
-df['scheduling'] = (df['interactiontype'] == "Scheduling or Show-and-Tell Visit").astype(int)
-df['concerns'] = (df['interactiontype'] == "Resident, Institutional or City Concern").astype(int)
-df['other'] = (df['interactiontype'] == "Other, such as Room Request").astype(int)
+# Interaction types that count as a first-time interaction
+FIRST_TIME_TYPES = frozenset({
+    "1st Time Inquiry – Requested by Org or Group",
+    "1st Time Outreach – Initiated by ECA Staff",
+})
 
-# ------------------------------
-# Process the members file
-members_df = pd.read_excel(members_path)
-members_filtered = members_df[
-    (members_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
-    (members_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
+# Columns read from each workbook (main-file names are compared after lowercasing and removing spaces)
+MAIN_COLUMNS = ['ecaactivitytype', 'interactiontype', 'parentcampaignname', 'site', 'startdateandtime']
+MEMBERS_COLUMNS = [
+    'Parent Campaign: Campaign Name', 'Campaign Name', 'ECA Affiliation Name', 'Full Name', 'Interaction Type'
 ]
-unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
-
-# Filter main dataframe to include only interactions for these parent campaigns
-df_filtered = df[df['parentcampaignname'].isin(unique_parent_campaigns)]
-interaction_types = df['interactiontype'].dropna().unique()
-for interaction in interaction_types:
-    col_name = interaction.lower().replace(' ', '_').replace('–', '').replace('(', '').replace(')', '')
-    df_filtered[col_name] = (df_filtered['interactiontype'] == interaction).astype(int)
-df_filtered['total_interactions'] = df_filtered.groupby('parentcampaignname')['interactiontype'].transform('count')
-
-first_interactions = df_filtered[
-    (df_filtered['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") | 
-    (df_filtered['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")
-].groupby('parentcampaignname')['num_startdate'].min()
-df_filtered['days_from_first'] = df_filtered.apply(
-    lambda row: row['num_startdate'] - first_interactions[row['parentcampaignname']], axis=1
-)
-mask = (df_filtered['days_from_first'] > 0) & (
-    (df_filtered['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") |
-    (df_filtered['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")
-)
-df_filtered.loc[mask, 'days_from_first'] = None
+
+# Indicator column name for each interaction type in the main data file
+INTERACTION_COLUMNS = {
+    "1st Time Inquiry – Requested by Org or Group": 'frst_inquiry',
+    "1st Time Outreach – Initiated by ECA Staff": 'frst_outreach',
+    "Follow Up Project Planning or Problem-Solving Meeting": 'followup_mtg',
+    "Reoccurring activity": 'reoccurring',
+    "Repeat – For Purposes of Ongoing Participation or to Rep ECA": 'repeat',
+    "Community Meeting": 'community_mtg',
+    "Stand alone activity": 'standalone',
+    "Scheduling or Show-and-Tell Visit": 'scheduling',
+    "Resident, Institutional or City Concern": 'concerns',
+    "Other, such as Room Request": 'other',
+}
 
 # ------------------------------
-# Process the v2 file for first-time interactions
-v2_df = pd.read_excel(v2_path)
-filtered_first_time = v2_df[
-    (v2_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
-    (v2_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
-]
+# Utility: normalise a header the way the main data file's columns are renamed
+def normalize_column(col):
+    return str(col).lower().replace(' ', '')
 
-v2_first_time_total = len(filtered_first_time)
-unique_eca = members_filtered[members_filtered['ECA Affiliation Name'].notna()]['ECA Affiliation Name'].nunique()
-unique_campaigns = len(unique_parent_campaigns)
+# ------------------------------
+# Utility: load an Excel file, reusing a Parquet copy of the parsed sheet when it is newer.
+# With normalized_usecols=True, usecols lists normalised header names instead of raw ones.
+def load_xlsx_cached(path, usecols=None, dtype=None, normalized_usecols=False):
+    # The column selection and dtypes are part of the cache name, so changing them gives a fresh cache
+    cache_key = hashlib.sha1(repr((usecols, dtype, normalized_usecols)).encode()).hexdigest()[:12]
+    pq_path = f"{path}.{cache_key}.parquet"
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(path):
+        try:
+            return pd.read_parquet(pq_path)
+        except Exception as e:
+            # A damaged cache must not take the site down; re-parse the workbook and rewrite it below
+            print(f"Could not read Parquet cache for {path}, re-reading the workbook: {str(e)}")
+    if normalized_usecols and usecols is not None:
+        wanted = set(usecols)
+        frame = pd.read_excel(path, engine='calamine', usecols=lambda col: normalize_column(col) in wanted, dtype=dtype)
+    else:
+        frame = pd.read_excel(path, engine='calamine', usecols=usecols, dtype=dtype)
+    # The deployment filesystem is read-only; only cache where the data directory can be written
+    cache_dir = os.path.dirname(pq_path)
+    if os.access(cache_dir, os.W_OK):
+        # Write to a temp file and rename it into place, so readers never see a partial cache
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.parquet.tmp')
+        os.close(fd)
+        try:
+            frame.to_parquet(tmp_path, compression='zstd')
+            os.replace(tmp_path, pq_path)
+        except Exception as e:
+            print(f"Could not write Parquet cache for {path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return frame
 
 # ------------------------------
-# Utility: clean campaign names
-def clean_parent_campaign(name):
-    if isinstance(name, str):
-        if " - " in name:
-            name = name.split(" - ", 1)[1].strip()
-        prefixes = ["PARENT1: CEC", "PARENT 1: CEC", "PARENT1:", "PARENT 1:", "CEC"]
-        for prefix in prefixes:
-            if name.startswith(prefix):
-                name = name[len(prefix):].strip()
-        name = re.sub(r'^[\-\–]+', '', name).strip()
-        return name.strip()
-    return name
-
-df['parentcampaignname'] = df['parentcampaignname'].apply(clean_parent_campaign)
-df_filtered['parentcampaignname'] = df_filtered['parentcampaignname'].apply(clean_parent_campaign)
-members_df['Parent Campaign: Campaign Name'] = members_df['Parent Campaign: Campaign Name'].apply(clean_parent_campaign)
-members_filtered['Parent Campaign: Campaign Name'] = members_filtered['Parent Campaign: Campaign Name'].apply(clean_parent_campaign)
-
-print("\nVerifying cleaned campaign names:")
-print("First 5 campaign names:")
-for name in df['parentcampaignname'].unique()[:5]:
-    print(f"- {name}")
+# Utility: clean campaign names (operates on a whole Series at once)
+CAMPAIGN_PREFIXES = ["PARENT1: CEC", "PARENT 1: CEC", "PARENT1:", "PARENT 1:", "CEC"]
+LEADING_DASHES = re.compile(r'^[\-\–]+')
+
+def clean_parent_campaign(names):
+    names = names.astype('string')
+    has_separator = names.str.contains(" - ", regex=False, na=False)
+    names = names.mask(has_separator, names.str.split(" - ", n=1).str[1].str.strip())
+    for prefix in CAMPAIGN_PREFIXES:
+        names = names.mask(names.str.startswith(prefix, na=False), names.str[len(prefix):].str.strip())
+    return names.str.replace(LEADING_DASHES, '', regex=True).str.strip()
 
 # ------------------------------
-# Initialize the Dash app
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Utility: build the campaign timeline figure for (a site's slice of) df_filtered
+def build_time_figure(filtered_df):
+    import plotly.graph_objects as go
+    try:
+        if filtered_df.empty:
+            return go.Figure()
+        ordered_types = list(INTERACTION_COLUMNS)
+        color_map = {
+            ordered_types[0]: "#1f77b4",
+            ordered_types[1]: "#2ca02c",
+            ordered_types[2]: "#FF0000",
+            ordered_types[3]: "#00FF00",
+            ordered_types[4]: "#0000FF",
+            ordered_types[5]: "#FFA500",
+            ordered_types[6]: "#800080",
+            ordered_types[7]: "#008080",
+            ordered_types[8]: "#FF69B4",
+            ordered_types[9]: "#808080"
+        }
+        fig = go.Figure()
+        # One background bar trace for all campaigns, in order of first appearance
+        if (filtered_df['interactiontype'] == ordered_types[0]).any():
+            max_days = filtered_df.groupby('parentcampaignname', observed=True, sort=False)['days_from_first'].max()
+            fig.add_trace(go.Bar(
+                y=max_days.index.tolist(),
+                x=max_days.tolist(),
+                marker_color='lightgray',
+                width=0.5,
+                orientation='h',
+                showlegend=False
+            ))
+        # One marker trace per interaction type
+        for interaction_type in ordered_types:
+            type_data = filtered_df[filtered_df['interactiontype'] == interaction_type].dropna(subset=['days_from_first'])
+            if interaction_type in FIRST_TIME_TYPES:
+                type_data = type_data[type_data['days_from_first'] == 0]
+            if type_data.empty:
+                continue
+            # Plain lists: plotly>=6 encodes numpy arrays as typed-array specs the bundled plotly.js can't read
+            days = type_data['days_from_first'].astype(int).tolist()
+            campaigns = type_data['parentcampaignname'].tolist()
+            fig.add_trace(go.Scatter(
+                y=campaigns,
+                x=days,
+                mode='markers',
+                marker=dict(
+                    color=color_map[interaction_type],
+                    size=10,
+                    symbol='line-ns',
+                    line=dict(width=3, color=color_map[interaction_type])
+                ),
+                name=interaction_type,
+                customdata=[[campaign, day, interaction_type] for campaign, day in zip(campaigns, days)],
+                hovertemplate=(
+                    "Campaign: %{customdata[0]}<br>"
+                    f"Interaction Type: {interaction_type}<br>"
+                    "Days after first interaction: %{customdata[1]}<br>"
+                    "Click for details<extra></extra>"
+                )
+            ))
+        fig.update_layout(
+            title="Campaign Timeline by Parent Campaign",
+            yaxis_title="Parent Campaign",
+            xaxis_title="Days Since First Interaction",
+            xaxis=dict(
+                range=[0, filtered_df['days_from_first'].max() * 1.1],
+                tickmode="array",
+                tickvals=list(range(0, int(filtered_df['days_from_first'].max()) + 30, 30)),
+                gridcolor='lightgray',
+                griddash='dot',
+                showgrid=True
+            ),
+            showlegend=True,
+            legend_title="Interaction Types",
+            template="plotly_white",
+            height=600,
+            barmode='overlay',
+            legend=dict(
+                yanchor="top",
+                y=0.99,
+                xanchor="left",
+                x=1.02,
+                traceorder='normal'
+            )
+        )
+        return fig
+    except Exception as e:
+        print(f"Error in build_time_figure: {str(e)}")
+        traceback.print_exc()
+        return go.Figure()
 
-def create_campaign_boxes():
-    campaign_boxes = []
-    for campaign in sorted(members_filtered['Parent Campaign: Campaign Name'].unique()):
-        campaign_data = members_filtered[members_filtered['Parent Campaign: Campaign Name'] == campaign]
-        box = dbc.Col(
+def create_campaign_boxes(members_filtered):
+    people_per_campaign = members_filtered.groupby('Parent Campaign: Campaign Name').size().sort_index()
+    return [
+        dbc.Col(
             dbc.Card([
                 dbc.CardBody([
                     html.H5(campaign, className="card-title"),
-                    html.P(f"People involved: {len(campaign_data)}", className="card-text"),
+                    html.P(f"People involved: {people}", className="card-text"),
                     dbc.Button("View Details", id={'type': 'campaign-button', 'index': campaign}, color="primary")
                 ])
             ], className="h-100 shadow-sm"),
             width=4, className="mb-4"
         )
-        campaign_boxes.append(box)
-    return campaign_boxes
-
-app.layout = html.Div([
-    # Header
-    html.Div([
-        html.H1("ECA Engagement Dashboard", className="display-4 text-center mb-4"),
-        html.H4("First-Time Interactions Analysis", className="text-center text-muted mb-5")
-    ], className="container mt-4"),
-
-    # Main stats row
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H2(f"{v2_first_time_total}", className="display-3 text-primary"),
-                html.P("Total First-Time Interactions", className="lead")
-            ], className="text-center p-4 border rounded")
-        ], width=4),
-        dbc.Col([
-            html.Div([
-                html.H2(f"{unique_eca}", className="display-3 text-success"),
-                html.P("Unique ECA Affiliations", className="lead")
-            ], className="text-center p-4 border rounded")
-        ], width=4),
-        dbc.Col([
-            html.Div([
-                html.H2(f"{unique_campaigns}", className="display-3 text-info"),
-                html.P("Parent Campaigns", className="lead")
-            ], className="text-center p-4 border rounded")
-        ], width=4),
-    ], className="mb-5"),
-
-    # Campaign boxes
-    dbc.Row(create_campaign_boxes(), className="mb-4"),
-
-    # Dropdown for site filter (if column exists)
-    html.Div([
-        dcc.Dropdown(
-            id='site-filter',
-            options=[{'label': site, 'value': site} for site in df['site'].unique()] if 'site' in df.columns else [],
-            placeholder="Select a site"
-        )
-    ], className="mb-4"),
+        for campaign, people in people_per_campaign.items()
+    ]
 
-    # Time graph
-    dcc.Graph(id='time-graph'),
+# ------------------------------
+# Data pipeline: runs once, on the first request that needs data, instead of at import
+@lru_cache(maxsize=1)
+def _build_data():
+    # ------------------------------
+    # Load and process the main data file
+    df = load_xlsx_cached(input_path, usecols=MAIN_COLUMNS, normalized_usecols=True)
+    # The v2 file is usually the same workbook; reuse the parse (before columns are renamed).
+    v2_df = (
+        df.copy() if v2_path == input_path
+        else load_xlsx_cached(v2_path, usecols=['Interaction Type'], dtype={'Interaction Type': 'category'})
+    )
+    df.columns = df.columns.str.lower().str.replace(' ', '')
+    # The raw header spelling is only known after normalising, so categorical dtypes are applied here
+    df = df.astype({col: 'category' for col in ['parentcampaignname', 'interactiontype', 'ecaactivitytype', 'site'] if col in df.columns})
+    # Parse the leading "MM/DD/YYYY" of "MM/DD/YYYY, <time>" directly; exact=False ignores the time part
+    start_dates = pd.to_datetime(df['startdateandtime'], format='%m/%d/%Y', exact=False, errors='coerce')
+    df.drop(columns=['startdateandtime'], inplace=True)
+    start_days = (start_dates - STATA_EPOCH).dt.days
+    # int32 unless some dates failed to parse; float32 still holds these day counts exactly alongside NaN
+    df['num_startdate'] = start_days.astype('int32' if start_days.notna().all() else 'float32')
+    df['parents_id'] = df['parentcampaignname'].cat.codes
+    df.sort_values(by=['parentcampaignname', 'num_startdate'], inplace=True)
+    campaign_counts = df.groupby('parentcampaignname', observed=True).cumcount() + 1
+    # cumcount is NaN for rows with no parent campaign; keep those as NaN the same way as num_startdate
+    df['num_campaigns'] = campaign_counts.astype('int32' if campaign_counts.notna().all() else 'float32')
+    df['meeting'] = (df['ecaactivitytype'] == 'Meeting').astype('int8')
+    df['event'] = (df['ecaactivitytype'] == 'Event').astype('int8')
+    interaction_dummies = (
+        pd.get_dummies(df['interactiontype'])
+        .reindex(columns=list(INTERACTION_COLUMNS), fill_value=0)
+        .astype('int8')
+        .rename(columns=INTERACTION_COLUMNS)
+    )
+    interaction_dummies.insert(0, 'firsttime', interaction_dummies['frst_inquiry'] | interaction_dummies['frst_outreach'])
+    df = pd.concat([df, interaction_dummies], axis=1)
+
+    # ------------------------------
+    # Process the members file
+    members_df = load_xlsx_cached(members_path, usecols=MEMBERS_COLUMNS, dtype={'Interaction Type': 'category'})
+    members_filtered = members_df[members_df['Interaction Type'].isin(FIRST_TIME_TYPES)].copy()
+    unique_parent_campaigns = frozenset(members_filtered['Parent Campaign: Campaign Name'].unique())
+
+    # Filter main dataframe to include only interactions for these parent campaigns
+    campaign_codes = df['parentcampaignname'].cat.codes.to_numpy()
+    kept_campaigns = df['parentcampaignname'].cat.categories.isin(unique_parent_campaigns)
+    df_filtered = df.loc[(campaign_codes >= 0) & kept_campaigns[campaign_codes]].copy()
+    interaction_types = df['interactiontype'].dropna().unique()
+    filtered_dummies = (
+        pd.get_dummies(df_filtered['interactiontype'])
+        .reindex(columns=list(interaction_types), fill_value=0)
+        .astype('int8')
+    )
+    filtered_dummies.columns = [
+        interaction.lower().replace(' ', '_').replace('–', '').replace('(', '').replace(')', '')
+        for interaction in filtered_dummies.columns
+    ]
+    # Per-campaign count of rows with an interaction type, broadcast back by category
+    interaction_counts = df_filtered.loc[df_filtered['interactiontype'].notna(), 'parentcampaignname'].value_counts()
+    df_filtered = df_filtered.assign(
+        **dict(filtered_dummies.items()),
+        total_interactions=df_filtered['parentcampaignname'].map(interaction_counts).astype('int32')
+    )
+
+    first_interactions = df_filtered[
+        df_filtered['interactiontype'].isin(FIRST_TIME_TYPES)
+    ].groupby('parentcampaignname', observed=True)['num_startdate'].min()
+    # Look up each row's first-interaction date by category code rather than by name
+    first_by_code = first_interactions.reindex(df_filtered['parentcampaignname'].cat.categories).to_numpy(dtype=float)
+    df_filtered['days_from_first'] = (
+        df_filtered['num_startdate'].to_numpy(dtype=float)
+        - first_by_code[df_filtered['parentcampaignname'].cat.codes.to_numpy()]
+    )
+    mask = (df_filtered['days_from_first'] > 0) & df_filtered['interactiontype'].isin(FIRST_TIME_TYPES)
+    df_filtered.loc[mask, 'days_from_first'] = None
+
+    # ------------------------------
+    # Process the v2 file for first-time interactions
+    filtered_first_time = v2_df[v2_df['Interaction Type'].isin(FIRST_TIME_TYPES)]
+
+    v2_first_time_total = len(filtered_first_time)
+    unique_eca = members_filtered[members_filtered['ECA Affiliation Name'].notna()]['ECA Affiliation Name'].nunique()
+    unique_campaigns = len(unique_parent_campaigns)
+
+    # ------------------------------
+    # Clean campaign names
+    df['parentcampaignname'] = clean_parent_campaign(df['parentcampaignname']).astype('category')
+    df_filtered['parentcampaignname'] = clean_parent_campaign(df_filtered['parentcampaignname']).astype('category')
+    members_df['Parent Campaign: Campaign Name'] = clean_parent_campaign(members_df['Parent Campaign: Campaign Name'])
+    members_filtered['Parent Campaign: Campaign Name'] = clean_parent_campaign(members_filtered['Parent Campaign: Campaign Name'])
 
-    # Modal for campaign details
+    # ------------------------------
+    # Time graph figures (the data is static, so each site's figure is built once)
+    # Figures are stored as plain JSON dicts so the callback returns them without rebuilding
+    fig_cache = {None: build_time_figure(df_filtered).to_plotly_json()}
+    if 'site' in df_filtered.columns:
+        for site in df['site'].dropna().unique():
+            fig_cache[site] = build_time_figure(df_filtered[df_filtered['site'] == site]).to_plotly_json()
+
+    # ------------------------------
+    # Campaign details for the modal, indexed once by parent campaign
+    campaign_sub_campaigns = {
+        campaign: sorted(campaign_data['Campaign Name'].dropna().unique())
+        for campaign, campaign_data in members_df.groupby('Parent Campaign: Campaign Name')
+    }
+    # (parent campaign, sub campaign) -> [(ECA affiliation, sorted unique participant names), ...]
+    modal_index = {}
+    for (campaign, sub_campaign, eca), names in (
+        members_df.dropna(subset=['ECA Affiliation Name', 'Full Name'])
+        .drop_duplicates(['Parent Campaign: Campaign Name', 'Campaign Name', 'ECA Affiliation Name', 'Full Name'])
+        .sort_values('Full Name')
+        .groupby(['Parent Campaign: Campaign Name', 'Campaign Name', 'ECA Affiliation Name'])['Full Name']
+        .apply(list)
+        .items()
+    ):
+        modal_index.setdefault((campaign, sub_campaign), []).append((eca, names))
+
+    return {
+        'df': df,
+        'v2_first_time_total': v2_first_time_total,
+        'unique_eca': unique_eca,
+        'unique_campaigns': unique_campaigns,
+        # Built once and shared by every layout render
+        'campaign_boxes': create_campaign_boxes(members_filtered),
+        'site_options': [{'label': site, 'value': site} for site in df['site'].unique()] if 'site' in df.columns else [],
+        'fig_cache': fig_cache,
+        'campaign_sub_campaigns': campaign_sub_campaigns,
+        'modal_index': modal_index,
+    }
+
+# lru_cache alone lets concurrent first requests each run the pipeline; serialise the first build
+_load_lock = threading.Lock()
+
+def _load():
+    # Once the data is built, skip the lock; only callers racing on the first build wait on it
+    if _build_data.cache_info().currsize:
+        return _build_data()
+    with _load_lock:
+        return _build_data()
+
+# ------------------------------
+# Initialize the Dash app
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+
+def serve_layout():
+    data = _load()
+    return html.Div([
+        # Header
+        html.Div([
+            html.H1("ECA Engagement Dashboard", className="display-4 text-center mb-4"),
+            html.H4("First-Time Interactions Analysis", className="text-center text-muted mb-5")
+        ], className="container mt-4"),
+
+        # Main stats row
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{data['v2_first_time_total']}", className="display-3 text-primary"),
+                    html.P("Total First-Time Interactions", className="lead")
+                ], className="text-center p-4 border rounded")
+            ], width=4),
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{data['unique_eca']}", className="display-3 text-success"),
+                    html.P("Unique ECA Affiliations", className="lead")
+                ], className="text-center p-4 border rounded")
+            ], width=4),
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{data['unique_campaigns']}", className="display-3 text-info"),
+                    html.P("Parent Campaigns", className="lead")
+                ], className="text-center p-4 border rounded")
+            ], width=4),
+        ], className="mb-5"),
+
+        # Campaign boxes
+        dbc.Row(data['campaign_boxes'], className="mb-4"),
+
+        # Dropdown for site filter (if column exists)
+        html.Div([
+            dcc.Dropdown(
+                id='site-filter',
+                options=data['site_options'],
+                placeholder="Select a site"
+            )
+        ], className="mb-4"),
+
+        # Time graph
+        dcc.Graph(id='time-graph'),
+
+        # Modal for campaign details
+        dbc.Modal([
+            dbc.ModalHeader(dbc.ModalTitle("Campaign Details")),
+            dbc.ModalBody(id="campaign-details-body"),
+            dbc.ModalFooter(dbc.Button("Close", id="close-modal", className="ms-auto"))
+        ], id="campaign-modal", size="lg"),
+
+        # Footer
+        html.Footer([
+            html.P("Data source: ECA Campaign Members FY25", className="text-muted text-center")
+        ], className="mt-5")
+    ], className="container-fluid px-4 py-4")
+
+# Dash calls a callable layout as soon as it is assigned to validate it, unless a
+# validation_layout is set. This static skeleton carries the callback ids, so assigning
+# serve_layout does not load the data at import.
+app.validation_layout = html.Div([
+    dcc.Dropdown(id='site-filter'),
+    dcc.Graph(id='time-graph'),
     dbc.Modal([
-        dbc.ModalHeader(dbc.ModalTitle("Campaign Details")),
         dbc.ModalBody(id="campaign-details-body"),
-        dbc.ModalFooter(dbc.Button("Close", id="close-modal", className="ms-auto"))
-    ], id="campaign-modal", size="lg"),
-
-    # Footer
-    html.Footer([
-        html.P("Data source: ECA Campaign Members FY25", className="text-muted text-center")
-    ], className="mt-5")
-], className="container-fluid px-4 py-4")
+        dbc.Button(id="close-modal")
+    ], id="campaign-modal")
+])
+# Dash accepts a callable layout; it is evaluated per page load, after _load() has cached the data
+app.layout = serve_layout
 
 # ------------------------------
 # Dash callbacks
@@ -210,23 +441,21 @@ app.layout = html.Div([
     prevent_initial_call=True
 )
 def toggle_modal(campaign_clicks, click_data, close_clicks):
-    ctx = dash.callback_context
-    if not ctx.triggered:
+    trigger_id = ctx.triggered_id
+    if trigger_id is None:
         return False, ""
-    trigger_id = ctx.triggered[0]["prop_id"]
     try:
-        if "close-modal" in trigger_id:
+        if trigger_id == "close-modal":
             return False, ""
-        if "campaign-button" in trigger_id:
-            button_id = json.loads(trigger_id.split('.')[0])
-            campaign_name = button_id['index']
-        elif "time-graph.clickData" in trigger_id:
+        if isinstance(trigger_id, dict) and trigger_id.get('type') == 'campaign-button':
+            campaign_name = trigger_id['index']
+        elif trigger_id == 'time-graph':
             campaign_name = click_data['points'][0]['customdata'][0]
             days_after = click_data['points'][0]['customdata'][1]
         else:
             return False, ""
-        campaign_data = members_df[members_df['Parent Campaign: Campaign Name'] == campaign_name]
-        if campaign_data.empty:
+        data = _load()
+        if campaign_name not in data['campaign_sub_campaigns']:
             return True, html.Div("No data available for this campaign")
         details = html.Div([
             html.H4(campaign_name, className="mb-4"),
@@ -237,13 +466,12 @@ def toggle_modal(campaign_clicks, click_data, close_clicks):
                     html.Ul([
                         html.Li([
                             html.Strong(f"{eca}: "),
-                            ", ".join(sorted(set(names)))
+                            ", ".join(names)
                         ])
-                        for eca, names in campaign_data[campaign_data['Campaign Name'] == sub_campaign].groupby('ECA Affiliation Name')['Full Name'].apply(list).items()
-                        if pd.notna(eca)
+                        for eca, names in data['modal_index'].get((campaign_name, sub_campaign), [])
                     ])
                 ])
-                for sub_campaign in sorted(campaign_data['Campaign Name'].unique())
+                for sub_campaign in data['campaign_sub_campaigns'][campaign_name]
             ]),
             html.Div(f"Days after first interaction: {days_after}" if 'days_after' in locals() else "", className="mt-3 text-muted")
         ])
@@ -257,111 +485,15 @@ def toggle_modal(campaign_clicks, click_data, close_clicks):
     Input('site-filter', 'value')
 )
 def update_time_graph(selected_site):
-    try:
-        filtered_df = df_filtered[df_filtered['site'] == selected_site] if selected_site else df_filtered
-        if filtered_df.empty:
-            return go.Figure()
-        ordered_types = [
-            "1st Time Inquiry – Requested by Org or Group",
-            "1st Time Outreach – Initiated by ECA Staff",
-            "Follow Up Project Planning or Problem-Solving Meeting",
-            "Reoccurring activity",
-            "Repeat – For Purposes of Ongoing Participation or to Rep ECA",
-            "Community Meeting",
-            "Stand alone activity",
-            "Scheduling or Show-and-Tell Visit",
-            "Resident, Institutional or City Concern",
-            "Other, such as Room Request"
-        ]
-        color_map = {
-            ordered_types[0]: "#1f77b4",
-            ordered_types[1]: "#2ca02c",
-            ordered_types[2]: "#FF0000",
-            ordered_types[3]: "#00FF00",
-            ordered_types[4]: "#0000FF",
-            ordered_types[5]: "#FFA500",
-            ordered_types[6]: "#800080",
-            ordered_types[7]: "#008080",
-            ordered_types[8]: "#FF69B4",
-            ordered_types[9]: "#808080"
-        }
-        fig = go.Figure()
-        legend_items = []
-        for interaction_type in ordered_types:
-            type_data = filtered_df[filtered_df['interactiontype'] == interaction_type]
-            if not type_data.empty:
-                for parent_campaign in filtered_df['parentcampaignname'].unique():
-                    campaign_data = type_data[type_data['parentcampaignname'] == parent_campaign]
-                    if interaction_type == ordered_types[0]:
-                        max_days = filtered_df[filtered_df['parentcampaignname'] == parent_campaign]['days_from_first'].max()
-                        fig.add_trace(go.Bar(
-                            name=parent_campaign,
-                            y=[parent_campaign],
-                            x=[max_days],
-                            marker_color='lightgray',
-                            width=0.5,
-                            orientation='h',
-                            showlegend=False
-                        ))
-                    for _, row in campaign_data.iterrows():
-                        if ("1st Time" in interaction_type and row['days_from_first'] != 0):
-                            continue
-                        fig.add_trace(go.Scatter(
-                            y=[parent_campaign],
-                            x=[row['days_from_first']],
-                            mode='markers',
-                            marker=dict(
-                                color=color_map[interaction_type],
-                                size=10,
-                                symbol='line-ns',
-                                line=dict(width=3, color=color_map[interaction_type])
-                            ),
-                            name=interaction_type,
-                            showlegend=(interaction_type not in legend_items),
-                            customdata=[[parent_campaign, int(row['days_from_first']), interaction_type]],
-                            hovertemplate=(
-                                f"Campaign: {parent_campaign}<br>"
-                                f"Interaction Type: {interaction_type}<br>"
-                                f"Days after first interaction: {int(row['days_from_first'])}<br>"
-                                f"Click for details<extra></extra>"
-                            )
-                        ))
-                        if interaction_type not in legend_items:
-                            legend_items.append(interaction_type)
-        fig.update_layout(
-            title="Campaign Timeline by Parent Campaign",
-            yaxis_title="Parent Campaign",
-            xaxis_title="Days Since First Interaction",
-            xaxis=dict(
-                range=[0, filtered_df['days_from_first'].max() * 1.1],
-                tickmode="array",
-                tickvals=list(range(0, int(filtered_df['days_from_first'].max()) + 30, 30)),
-                gridcolor='lightgray',
-                griddash='dot',
-                showgrid=True
-            ),
-            showlegend=True,
-            legend_title="Interaction Types",
-            template="plotly_white",
-            height=600,
-            barmode='overlay',
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=1.02,
-                traceorder='normal'
-            )
-        )
-        return fig
-    except Exception as e:
-        print(f"Error in update_time_graph: {str(e)}")
-        traceback.print_exc()
-        return go.Figure()
+    fig_cache = _load()['fig_cache']
+    return fig_cache.get(selected_site, fig_cache[None])
 
 # ------------------------------
 # Expose the underlying Flask server as "application" for Vercel
 application = app.server
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    print("\nVerifying cleaned campaign names:")
+    print("First 5 campaign names:")
+    print('\n'.join(f"- {name}" for name in _load()['df']['parentcampaignname'].drop_duplicates().head(5)))
+    app.run_server(debug=True)
\ No newline at end of file